@@ -2,6 +2,12 @@ import argparse
 import random
 import string
 
+# The pool of characters to choose from: lowercase, uppercase and digits
+ALPHABET = string.ascii_letters + string.digits
+
+# OS-backed CSPRNG (os.urandom), since the output is used as an API key
+_rng = random.SystemRandom()
+
 def generate_password(length: int) -> str:
     """
     Generates a random password of a specified length.
@@ -11,11 +17,8 @@ def generate_password(length: int) -> str:
     if length <= 0:
         raise ValueError("Password length must be a positive integer.")
 
-    # Define the pool of characters to choose from
-    characters = string.ascii_letters + string.digits
-    
-    # Use random.choice to select characters and join them into a string
-    password = ''.join(random.choice(characters) for _ in range(length))
+    # Draw all characters in a single call and join them into a string
+    password = ''.join(_rng.choices(ALPHABET, k=length))
     
     return password
 
@@ -1,11 +1,27 @@
-from flask import Flask, request, jsonify
+# Patch blocking stdlib I/O before anything else imports socket/ssl, so the
+# outbound Resend calls yield to other requests under gevent workers
+from gevent import monkey
+monkey.patch_all()
+
+from flask import Flask, Response, request
 from flask_cors import CORS
-import resend
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from string import Template
+import hashlib
+import hmac
 import logging
-from pydantic import ValidationError
+from markupsafe import escape
+from pydantic import BaseModel, ValidationError
+
+import mailer
+from throttle import RecentSends, SlidingWindowLimiter
+from email_templates import (
+    VERIFICATION_TEMPLATE,
+    PASSWORD_RESET_TEMPLATE,
+    WELCOME_TEMPLATE
+)
 
 # Import Pydantic models
 from models import (
@@ -14,7 +30,9 @@ from models import (
     WelcomeEmailRequest,
     EmailResponse,
     ErrorResponse,
-    HealthResponse
+    HealthResponse,
+    validation_error_response,
+    warmup
 )
 
 # Load environment variables - try service-local first, then root
@@ -29,6 +47,9 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Pay model first-use costs at boot rather than on the first request
+warmup()
+
 # Configure CORS to only allow localhost/127.0.0.1 (same device/VPS)
 CORS(app, resources={
     r"/api/*": {
@@ -39,20 +60,72 @@ CORS(app, resources={
 })
 
 # Configure Resend
-resend.api_key = os.getenv("RESEND_API_KEY")
+mailer.set_api_key(os.getenv("RESEND_API_KEY"))
+mailer.configure(
+    workers=int(os.getenv("EMAIL_WORKERS", mailer.WORKERS)),
+    flush_interval=float(os.getenv("EMAIL_FLUSH_INTERVAL", mailer.FLUSH_INTERVAL))
+)
 FROM_EMAIL = os.getenv("FROM_EMAIL", "onboarding@resend.dev")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+# Fixed parts of each outgoing payload; handlers only add "to" and "html"
+VERIFICATION_BASE = {"from": FROM_EMAIL, "subject": "Verify Your Email Address - OTP Code"}
+PASSWORD_RESET_BASE = {"from": FROM_EMAIL, "subject": "Reset Your Password - OTP Code"}
+WELCOME_BASE = {"from": FROM_EMAIL, "subject": "Welcome to Tabrela!"}
+
+# FRONTEND_URL is fixed for the lifetime of the process, so bind it once.
+# The result is parsed as a template again, so any "$" in the URL is
+# doubled to keep it literal.
+WELCOME_TEMPLATE_BOUND = Template(WELCOME_TEMPLATE.safe_substitute(
+    frontend_url=str(escape(FRONTEND_URL)).replace("$", "$$")
+))
+
 # API Key for authentication between services
 SERVICE_API_KEY = os.getenv("SERVICE_API_KEY")
+_SERVICE_API_KEY_BYTES = (SERVICE_API_KEY or "").encode()
+
+# Send limits: per API key per minute, and per recipient per hour
+RATE_LIMIT_PER_KEY = int(os.getenv("EMAIL_RATE_LIMIT_PER_KEY", 600))
+RATE_LIMIT_PER_RECIPIENT = int(os.getenv("EMAIL_RATE_LIMIT_PER_RECIPIENT", 10))
+key_limiter = SlidingWindowLimiter(RATE_LIMIT_PER_KEY, 60)
+recipient_limiter = SlidingWindowLimiter(RATE_LIMIT_PER_RECIPIENT, 3600)
+
+# Repeats of the same email within these windows (in seconds) are not resent
+OTP_DEDUP_TTL = 60
+WELCOME_DEDUP_TTL = 24 * 3600
+recent_sends = RecentSends()
+
+
+def json_response(model: BaseModel, status: int) -> Response:
+    """Serialize a response model straight to JSON with Pydantic's serializer"""
+    return Response(model.model_dump_json(), status=status, mimetype="application/json")
 
 
 def verify_api_key():
-    """Verify the API key from the request header"""
-    api_key = request.headers.get("X-API-Key")
-    if not api_key or api_key != SERVICE_API_KEY:
-        return False
-    return True
+    """Verify the API key from the request header in constant time"""
+    api_key = request.headers.get("X-API-Key", "").encode()
+    return bool(_SERVICE_API_KEY_BYTES) and hmac.compare_digest(api_key, _SERVICE_API_KEY_BYTES)
+
+
+def send_key(*parts: str) -> str:
+    """Key identifying an email by its kind, recipient and content"""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def is_duplicate(key: str, ttl: int) -> bool:
+    """Check whether an identical email was already sent within `ttl` seconds"""
+    return not recent_sends.add(key, ttl)
+
+
+def is_rate_limited(to_email: str) -> bool:
+    """Check the caller's API key and the recipient against their send limits"""
+    if not key_limiter.hit(request.headers.get("X-API-Key", "")):
+        logger.warning("Send rate limit exceeded for API key")
+        return True
+    if not recipient_limiter.hit(to_email.lower()):
+        logger.warning("Send rate limit exceeded for %s", to_email)
+        return True
+    return False
 
 
 @app.route("/health", methods=["GET"])
@@ -63,7 +136,7 @@ def health():
         service="email-service",
         version="1.0.0"
     )
-    return jsonify(response.model_dump()), 200
+    return json_response(response, 200)
 
 
 @app.route("/api/send-verification-email", methods=["POST"])
@@ -71,66 +144,49 @@ def send_verification_email():
     """Send OTP verification email"""
     if not verify_api_key():
         error = ErrorResponse(error="Unauthorized")
-        return jsonify(error.model_dump()), 401
+        return json_response(error, 401)
 
     try:
         # Validate request data using Pydantic
-        data = request.json
-        validated_data = VerificationEmailRequest(**data)
+        validated_data = VerificationEmailRequest.model_validate_json(request.get_data())
         
         to_email = validated_data.to_email
         username = validated_data.username
         otp = validated_data.otp
 
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="margin: 0;">Welcome to Tabrela!</h1>
-            </div>
-            <div style="background: #f9fafb; padding: 30px; border-radius: 0 0 10px 10px;">
-                <h2 style="color: #333;">Hi {username},</h2>
-                <p style="color: #333; line-height: 1.6;">Thank you for registering! Please use the following one-time password (OTP) to verify your email address:</p>
-                
-                <div style="background: white; border: 2px dashed #667eea; padding: 20px; text-align: center; border-radius: 10px; margin: 20px 0;">
-                    <div style="font-size: 36px; font-weight: bold; letter-spacing: 8px; color: #667eea; font-family: 'Courier New', monospace;">{otp}</div>
-                </div>
-                
-                <p style="color: #333;"><strong>This code will expire in 10 minutes.</strong></p>
-                <p style="color: #333;">If you didn't create an account, you can safely ignore this email.</p>
-                
-                <div style="text-align: center; margin-top: 30px; color: #6b7280; font-size: 12px;">
-                    <p>&copy; 2025 Tabrela. All rights reserved.</p>
-                </div>
-            </div>
-        </div>
-        """
-
-        response = resend.Emails.send({
-            "from": FROM_EMAIL,
-            "to": to_email,
-            "subject": "Verify Your Email Address - OTP Code",
-            "html": html
-        })
-
-        logger.info(f"Verification email sent to {to_email}")
+        # Repeats are answered before the rate limit, so retries and
+        # double-clicks do not use up the recipient's budget
+        key = send_key("verification", to_email.lower(), otp)
+        if is_duplicate(key, ttl=OTP_DEDUP_TTL):
+            logger.info("Duplicate verification email for %s skipped", to_email)
+            email_response = EmailResponse(success=True, message="Email already sent")
+            return json_response(email_response, 200)
+
+        if is_rate_limited(to_email):
+            # Nothing was sent, so a later retry must not count as a repeat
+            recent_sends.discard(key)
+            error = ErrorResponse(error="Too many requests")
+            return json_response(error, 429)
+
+        html = VERIFICATION_TEMPLATE.substitute(username=escape(username), otp=otp)
+
+        email_id = mailer.enqueue({**VERIFICATION_BASE, "to": to_email, "html": html})
+
+        logger.info("Verification email queued for %s", to_email)
         email_response = EmailResponse(
             success=True,
-            email_id=response.get("id"),
-            message="Verification email sent successfully"
+            email_id=email_id,
+            message="Verification email queued for delivery"
         )
-        return jsonify(email_response.model_dump()), 200
+        return json_response(email_response, 202)
 
     except ValidationError as e:
-        logger.error(f"Validation error: {e.errors()}")
-        error = ErrorResponse(
-            error="Validation error",
-            details={"errors": e.errors()}
-        )
-        return jsonify(error.model_dump()), 400
+        logger.error("Validation error: %s", e.errors())
+        return json_response(validation_error_response(e), 400)
     except Exception as e:
-        logger.error(f"Error sending verification email: {str(e)}")
+        logger.error("Error sending verification email: %s", e, exc_info=True)
         error = ErrorResponse(error=str(e))
-        return jsonify(error.model_dump()), 500
+        return json_response(error, 500)
 
 
 @app.route("/api/send-password-reset-email", methods=["POST"])
@@ -138,66 +194,49 @@ def send_password_reset_email():
     """Send password reset OTP email"""
     if not verify_api_key():
         error = ErrorResponse(error="Unauthorized")
-        return jsonify(error.model_dump()), 401
+        return json_response(error, 401)
 
     try:
         # Validate request data using Pydantic
-        data = request.json
-        validated_data = PasswordResetEmailRequest(**data)
+        validated_data = PasswordResetEmailRequest.model_validate_json(request.get_data())
         
         to_email = validated_data.to_email
         username = validated_data.username
         otp = validated_data.otp
 
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="margin: 0;">🔒 Password Reset Request</h1>
-            </div>
-            <div style="background: #f9fafb; padding: 30px; border-radius: 0 0 10px 10px;">
-                <h2 style="color: #333;">Hi {username},</h2>
-                <p style="color: #333; line-height: 1.6;">We received a request to reset your password. Use the OTP below to reset your password:</p>
-                <div style="text-align: center; margin: 30px 0;">
-                    <div style="display: inline-block; background: white; padding: 20px 40px; border: 2px dashed #667eea; border-radius: 8px; font-size: 32px; font-weight: bold; letter-spacing: 8px; color: #333;">{otp}</div>
-                </div>
-                <p style="color: #333; line-height: 1.6;">This OTP will expire in <strong>10 minutes</strong> and can only be used once. You have <strong>5 attempts</strong> to enter it correctly.</p>
-                <div style="background: #fef2f2; border-left: 4px solid #ef4444; padding: 15px; margin: 20px 0;">
-                    <strong style="color: #333;">Security Notice:</strong> <span style="color: #333;">If you didn't request a password reset, please ignore this email or contact support if you're concerned about your account security.</span>
-                </div>
-                
-                <div style="text-align: center; margin-top: 30px; color: #6b7280; font-size: 12px;">
-                    <p>&copy; 2025 Tabrela. All rights reserved.</p>
-                </div>
-            </div>
-        </div>
-        """
-
-        response = resend.Emails.send({
-            "from": FROM_EMAIL,
-            "to": to_email,
-            "subject": "Reset Your Password - OTP Code",
-            "html": html
-        })
-
-        logger.info(f"Password reset OTP email sent to {to_email}")
+        # Repeats are answered before the rate limit, so retries and
+        # double-clicks do not use up the recipient's budget
+        key = send_key("password-reset", to_email.lower(), otp)
+        if is_duplicate(key, ttl=OTP_DEDUP_TTL):
+            logger.info("Duplicate password reset email for %s skipped", to_email)
+            email_response = EmailResponse(success=True, message="Email already sent")
+            return json_response(email_response, 200)
+
+        if is_rate_limited(to_email):
+            # Nothing was sent, so a later retry must not count as a repeat
+            recent_sends.discard(key)
+            error = ErrorResponse(error="Too many requests")
+            return json_response(error, 429)
+
+        html = PASSWORD_RESET_TEMPLATE.substitute(username=escape(username), otp=otp)
+
+        email_id = mailer.enqueue({**PASSWORD_RESET_BASE, "to": to_email, "html": html})
+
+        logger.info("Password reset OTP email queued for %s", to_email)
         email_response = EmailResponse(
             success=True,
-            email_id=response.get("id"),
-            message="Password reset email sent successfully"
+            email_id=email_id,
+            message="Password reset email queued for delivery"
         )
-        return jsonify(email_response.model_dump()), 200
+        return json_response(email_response, 202)
 
     except ValidationError as e:
-        logger.error(f"Validation error: {e.errors()}")
-        error = ErrorResponse(
-            error="Validation error",
-            details={"errors": e.errors()}
-        )
-        return jsonify(error.model_dump()), 400
+        logger.error("Validation error: %s", e.errors())
+        return json_response(validation_error_response(e), 400)
     except Exception as e:
-        logger.error(f"Error sending password reset email: {str(e)}")
+        logger.error("Error sending password reset email: %s", e, exc_info=True)
         error = ErrorResponse(error=str(e))
-        return jsonify(error.model_dump()), 500
+        return json_response(error, 500)
 
 
 @app.route("/api/send-welcome-email", methods=["POST"])
@@ -205,70 +244,57 @@ def send_welcome_email():
     """Send welcome email after email verification"""
     if not verify_api_key():
         error = ErrorResponse(error="Unauthorized")
-        return jsonify(error.model_dump()), 401
+        return json_response(error, 401)
 
     try:
         # Validate request data using Pydantic
-        data = request.json
-        validated_data = WelcomeEmailRequest(**data)
+        validated_data = WelcomeEmailRequest.model_validate_json(request.get_data())
         
         to_email = validated_data.to_email
         username = validated_data.username
 
-        html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="margin: 0;">🎉 Welcome to Tabrela!</h1>
-            </div>
-            <div style="background: #f9fafb; padding: 30px; border-radius: 0 0 10px 10px;">
-                <h2 style="color: #333;">Hi {username},</h2>
-                <p style="color: #333; line-height: 1.6;">Your email has been successfully verified! You now have full access to your Tabrela account.</p>
-                <p style="color: #333;">We're excited to have you on board!</p>
-                <div style="text-align: center; margin: 20px 0;">
-                    <a href="{FRONTEND_URL}" style="display: inline-block; background: #667eea; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px;">Go to Dashboard</a>
-                </div>
-                <p style="color: #333;">If you have any questions, feel free to reach out to our support team.</p>
-                
-                <div style="text-align: center; margin-top: 30px; color: #6b7280; font-size: 12px;">
-                    <p>&copy; 2025 Tabrela. All rights reserved.</p>
-                </div>
-            </div>
-        </div>
-        """
-
-        response = resend.Emails.send({
-            "from": FROM_EMAIL,
-            "to": to_email,
-            "subject": "Welcome to Tabrela!",
-            "html": html
-        })
-
-        logger.info(f"Welcome email sent to {to_email}")
+        # Repeats are answered before the rate limit, so retries and
+        # double-clicks do not use up the recipient's budget
+        key = send_key("welcome", to_email.lower())
+        if is_duplicate(key, ttl=WELCOME_DEDUP_TTL):
+            logger.info("Duplicate welcome email for %s skipped", to_email)
+            email_response = EmailResponse(success=True, message="Email already sent")
+            return json_response(email_response, 200)
+
+        if is_rate_limited(to_email):
+            # Nothing was sent, so a later retry must not count as a repeat
+            recent_sends.discard(key)
+            error = ErrorResponse(error="Too many requests")
+            return json_response(error, 429)
+
+        html = WELCOME_TEMPLATE_BOUND.substitute(username=escape(username))
+
+        email_id = mailer.enqueue({**WELCOME_BASE, "to": to_email, "html": html})
+
+        logger.info("Welcome email queued for %s", to_email)
         email_response = EmailResponse(
             success=True,
-            email_id=response.get("id"),
-            message="Welcome email sent successfully"
+            email_id=email_id,
+            message="Welcome email queued for delivery"
         )
-        return jsonify(email_response.model_dump()), 200
+        return json_response(email_response, 202)
 
     except ValidationError as e:
-        logger.error(f"Validation error: {e.errors()}")
-        error = ErrorResponse(
-            error="Validation error",
-            details={"errors": e.errors()}
-        )
-        return jsonify(error.model_dump()), 400
+        logger.error("Validation error: %s", e.errors())
+        return json_response(validation_error_response(e), 400)
     except Exception as e:
-        logger.error(f"Error sending welcome email: {str(e)}")
+        logger.error("Error sending welcome email: %s", e, exc_info=True)
         error = ErrorResponse(error=str(e))
-        return jsonify(error.model_dump()), 500
+        return json_response(error, 500)
 
 
 if __name__ == "__main__":
+    # Local development only - in production run under gevent workers:
+    #   gunicorn -k gevent -w 2 --worker-connections 1000 -b 0.0.0.0:$PORT app:app
     port = int(os.getenv("PORT", 5000))
     debug = os.getenv("DEBUG", "False").lower() == "true"
     
-    logger.info(f"Starting email service on port {port}")
-    logger.info(f"CORS configured for localhost only")
+    logger.info("Starting email service on port %s", port)
+    logger.info("CORS configured for localhost only")
     
     app.run(host="0.0.0.0", port=port, debug=debug)
@@ -0,0 +1,161 @@
+"""
+Background delivery of outgoing emails.
+Request handlers enqueue a Resend payload and return immediately. Queued
+emails are collected into batches and sent with Resend's batch endpoint,
+so bursts of sign-ups turn into a handful of HTTPS calls instead of one
+call per email.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import logging
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RESEND_BATCH_URL = "https://api.resend.com/emails/batch"
+# Defaults for configure(); app.py overrides them from the environment
+WORKERS = 8
+
+# Resend accepts at most 100 emails per batch request
+BATCH_SIZE = 100
+# Longest time (in seconds) a queued email waits for its batch to fill up
+FLUSH_INTERVAL = 0.2
+
+# One pooled session for all sends, so TLS connections to Resend are kept
+# alive and reused instead of being re-established for every batch.
+# Transient failures are retried with backoff (0s, 10s, 20s); the
+# Idempotency-Key header set per batch keeps retried POSTs from sending twice.
+session = requests.Session()
+
+
+def _mount_adapter(workers: int) -> None:
+    """Size the connection pool to the number of send workers"""
+    session.mount("https://", HTTPAdapter(
+        pool_connections=workers,
+        pool_maxsize=workers,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=None
+        )
+    ))
+
+
+_mount_adapter(WORKERS)
+
+
+def set_api_key(api_key: str) -> None:
+    """Set the Resend API key used for all sends"""
+    session.headers["Authorization"] = f"Bearer {api_key}"
+
+
+class BatchSender:
+    """Collects queued emails and sends them to Resend in batches"""
+
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        workers: int = WORKERS
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # (enqueued at, email ID, payload), oldest first
+        self._pending: list[tuple[float, str, dict]] = []
+        self._cond = threading.Condition()
+        self._flusher = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-send")
+
+    def enqueue(self, payload: dict) -> str:
+        """Queue an email for delivery and return its queued email ID"""
+        email_id = uuid.uuid4().hex
+        with self._cond:
+            # Started lazily so the thread belongs to the gunicorn worker,
+            # not the master process the app may have been imported in
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="email-flush", daemon=True)
+                self._flusher.start()
+            self._pending.append((time.monotonic(), email_id, payload))
+            self._cond.notify()
+        return email_id
+
+    def _run(self) -> None:
+        """Hand off a batch once it is full or its oldest email has waited long enough"""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Measured from the oldest email, so leftovers from a full
+                # batch do not get a fresh wait
+                deadline = self._pending[0][0] + self.flush_interval
+                while len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+
+            try:
+                self._executor.submit(self._send, batch)
+            except RuntimeError:
+                # The executor stops taking work at interpreter shutdown
+                self._send(batch)
+
+    def flush(self) -> None:
+        """
+        Send everything still queued, in the calling thread.
+        Registered to run at exit, so emails that were accepted with a 202
+        are not lost when a worker restarts mid flush window.
+        """
+        with self._cond:
+            pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.batch_size):
+            self._send(pending[start:start + self.batch_size])
+
+    def _send(self, batch: list[tuple[float, str, dict]]) -> None:
+        """Send one batch through the Resend REST API"""
+        email_ids = [email_id for _, email_id, _ in batch]
+        try:
+            response = session.post(
+                RESEND_BATCH_URL,
+                json=[payload for _, _, payload in batch],
+                headers={"Idempotency-Key": uuid.uuid4().hex},
+                timeout=(3, 10)
+            )
+            response.raise_for_status()
+            for email_id, sent in zip(email_ids, response.json().get("data", [])):
+                logger.info("Email %s delivered as %s", email_id, sent.get("id"))
+        except Exception as e:
+            logger.error("Failed to deliver emails %s: %s", ", ".join(email_ids), e, exc_info=True)
+
+
+_sender = BatchSender()
+
+
+def configure(workers: int = WORKERS, flush_interval: float = FLUSH_INTERVAL) -> None:
+    """Set the send worker pool size and flush interval; call before the first enqueue"""
+    global _sender
+    _mount_adapter(workers)
+    _sender = BatchSender(flush_interval=flush_interval, workers=workers)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    """Deliver emails still waiting for their batch when the process exits"""
+    _sender.flush()
+
+
+def enqueue(payload: dict) -> str:
+    """Queue an email for delivery and return its queued email ID"""
+    return _sender.enqueue(payload)
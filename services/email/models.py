@@ -3,52 +3,46 @@ Pydantic models for email service request validation.
 Enforces strict data types and validation for all incoming requests.
 """
 
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional
-import re
+from pydantic import BaseModel, EmailStr, Field, StringConstraints, ValidationError
+from typing import Annotated, Optional
+import json
 
 
-class VerificationEmailRequest(BaseModel):
-    """Model for email verification request"""
+# Shared field types; constraints are enforced by pydantic-core itself
+Username = Annotated[str, StringConstraints(strip_whitespace=True, min_length=3, max_length=50)]
+OTP = Annotated[str, StringConstraints(min_length=6, max_length=6, pattern=r"^\d{6}$")]
+
+
+class _EmailRequestBase(BaseModel):
+    """Fields common to every email request"""
     to_email: EmailStr = Field(
         ...,
         description="Recipient email address",
         examples=["user@example.com"]
     )
-    username: str = Field(
+    username: Username = Field(
         ...,
-        min_length=3,
-        max_length=50,
         description="Username of the recipient",
         examples=["johndoe"]
     )
-    otp: str = Field(
+
+    model_config = {
+        "str_strip_whitespace": True
+    }
+
+
+class _OTPEmailBase(_EmailRequestBase):
+    """Fields common to emails carrying a one-time password"""
+    otp: OTP = Field(
         ...,
-        min_length=6,
-        max_length=6,
-        pattern=r"^\d{6}$",
         description="6-digit OTP code",
         examples=["123456"]
     )
 
-    @field_validator('otp')
-    @classmethod
-    def validate_otp(cls, v: str) -> str:
-        """Validate that OTP is exactly 6 digits"""
-        if not re.match(r"^\d{6}$", v):
-            raise ValueError("OTP must be exactly 6 digits")
-        return v
-
-    @field_validator('username')
-    @classmethod
-    def validate_username(cls, v: str) -> str:
-        """Validate username format"""
-        if not v.strip():
-            raise ValueError("Username cannot be empty or whitespace only")
-        return v.strip()
 
+class VerificationEmailRequest(_OTPEmailBase):
+    """Model for email verification request"""
     model_config = {
-        "str_strip_whitespace": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -61,47 +55,9 @@ class VerificationEmailRequest(BaseModel):
     }
 
 
-class PasswordResetEmailRequest(BaseModel):
+class PasswordResetEmailRequest(_OTPEmailBase):
     """Model for password reset email request"""
-    to_email: EmailStr = Field(
-        ...,
-        description="Recipient email address",
-        examples=["user@example.com"]
-    )
-    username: str = Field(
-        ...,
-        min_length=3,
-        max_length=50,
-        description="Username of the recipient",
-        examples=["johndoe"]
-    )
-    otp: str = Field(
-        ...,
-        min_length=6,
-        max_length=6,
-        pattern=r"^\d{6}$",
-        description="6-digit OTP code for password reset",
-        examples=["123456"]
-    )
-
-    @field_validator('otp')
-    @classmethod
-    def validate_otp(cls, v: str) -> str:
-        """Validate that OTP is exactly 6 digits"""
-        if not re.match(r"^\d{6}$", v):
-            raise ValueError("OTP must be exactly 6 digits")
-        return v
-
-    @field_validator('username')
-    @classmethod
-    def validate_username(cls, v: str) -> str:
-        """Validate username format"""
-        if not v.strip():
-            raise ValueError("Username cannot be empty or whitespace only")
-        return v.strip()
-
     model_config = {
-        "str_strip_whitespace": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -114,31 +70,9 @@ class PasswordResetEmailRequest(BaseModel):
     }
 
 
-class WelcomeEmailRequest(BaseModel):
+class WelcomeEmailRequest(_EmailRequestBase):
     """Model for welcome email request"""
-    to_email: EmailStr = Field(
-        ...,
-        description="Recipient email address",
-        examples=["user@example.com"]
-    )
-    username: str = Field(
-        ...,
-        min_length=3,
-        max_length=50,
-        description="Username of the recipient",
-        examples=["johndoe"]
-    )
-
-    @field_validator('username')
-    @classmethod
-    def validate_username(cls, v: str) -> str:
-        """Validate username format"""
-        if not v.strip():
-            raise ValueError("Username cannot be empty or whitespace only")
-        return v.strip()
-
     model_config = {
-        "str_strip_whitespace": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -158,7 +92,7 @@ class EmailResponse(BaseModel):
     )
     email_id: Optional[str] = Field(
         default=None,
-        description="Email ID from the email service provider"
+        description="ID assigned to the queued email"
     )
     message: Optional[str] = Field(
         default=None,
@@ -227,3 +161,33 @@ class HealthResponse(BaseModel):
             ]
         }
     }
+
+
+def validation_error_response(error: ValidationError) -> ErrorResponse:
+    """
+    Build the 400 response body for a request that failed validation.
+    The offending input is left out: it may be raw request bytes (e.g. a
+    body that is not valid UTF-8), which cannot be serialized to JSON.
+    """
+    return ErrorResponse(
+        error="Validation error",
+        details={"errors": error.errors(include_input=False)}
+    )
+
+
+def warmup() -> None:
+    """
+    Validate and serialize each model's schema example once.
+    Called at startup so one-off first-use costs (e.g. the lazy imports
+    done by email validation) are paid before the first real request.
+    """
+    for model in (
+        VerificationEmailRequest,
+        PasswordResetEmailRequest,
+        WelcomeEmailRequest,
+        EmailResponse,
+        ErrorResponse,
+        HealthResponse
+    ):
+        example = model.model_config["json_schema_extra"]["examples"][0]
+        model.model_validate_json(json.dumps(example)).model_dump_json()
@@ -2,7 +2,11 @@ import resend
 import dotenv
 import os
 
-if(dotenv.load_dotenv(dotenv.find_dotenv())):
+
+def main():
+    """Send a single demo email using the credentials in .env"""
+    if not dotenv.load_dotenv(dotenv.find_dotenv()):
+        return
 
     resend.api_key = os.getenv("API_KEY")
 
@@ -12,3 +16,7 @@ if(dotenv.load_dotenv(dotenv.find_dotenv())):
     "subject": "👀",
     "html": "<p><strong>yooo</strong></p>"
     })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Tests for the send endpoints' repeat detection and rate limiting.
+Emails are captured instead of being queued for delivery.
+"""
+
+import pytest
+
+import app
+import mailer
+from throttle import RecentSends, SlidingWindowLimiter
+
+API_KEY = b"test-api-key"
+
+WELCOME_REQUEST = {"to_email": "user@example.com", "username": "johndoe"}
+
+
+def otp_request(otp: str) -> dict:
+    return {"to_email": "user@example.com", "username": "johndoe", "otp": otp}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Fresh throttle state, a recipient limit of 2, and captured emails"""
+    emails = []
+    monkeypatch.setattr(app, "_SERVICE_API_KEY_BYTES", API_KEY)
+    monkeypatch.setattr(app, "key_limiter", SlidingWindowLimiter(100, 60))
+    monkeypatch.setattr(app, "recipient_limiter", SlidingWindowLimiter(2, 3600))
+    monkeypatch.setattr(app, "recent_sends", RecentSends())
+    monkeypatch.setattr(mailer, "enqueue", lambda payload: emails.append(payload) or "queued-id")
+    return emails
+
+
+def post(path: str, body: dict):
+    client = app.app.test_client()
+    return client.post(path, json=body, headers={"X-API-Key": API_KEY.decode()})
+
+
+def test_repeats_are_answered_before_the_rate_limit(sent):
+    """Retries of a sent email get 200 and do not use up the recipient's budget"""
+    responses = [post("/api/send-welcome-email", WELCOME_REQUEST) for _ in range(5)]
+
+    assert [r.status_code for r in responses] == [202, 200, 200, 200, 200]
+    assert responses[1].get_json()["message"] == "Email already sent"
+    assert len(sent) == 1
+
+    # One send used, so a different email to the same recipient still goes out
+    assert post("/api/send-verification-email", otp_request("111111")).status_code == 202
+    assert len(sent) == 2
+
+
+def test_rate_limited_request_is_not_remembered_as_sent(sent):
+    """A 429 forgets the request, so its retry is limited again rather than 'already sent'"""
+    assert post("/api/send-verification-email", otp_request("111111")).status_code == 202
+    assert post("/api/send-verification-email", otp_request("222222")).status_code == 202
+
+    assert post("/api/send-verification-email", otp_request("333333")).status_code == 429
+    assert post("/api/send-verification-email", otp_request("333333")).status_code == 429
+    assert len(sent) == 2
+
+    # Once the recipient has budget again, the retry is sent
+    app.recipient_limiter = SlidingWindowLimiter(2, 3600)
+    assert post("/api/send-verification-email", otp_request("333333")).status_code == 202
+    assert len(sent) == 3
+
+
+def test_non_utf8_body_gets_json_error(sent):
+    """A body that is not valid UTF-8 is rejected with a JSON 400"""
+    client = app.app.test_client()
+    response = client.post(
+        "/api/send-verification-email",
+        data=b"\xff\xfe",
+        headers={"X-API-Key": API_KEY.decode(), "Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Validation error"
@@ -0,0 +1,36 @@
+"""
+Tests for batched background delivery.
+"""
+
+import mailer
+from mailer import BatchSender
+
+
+def test_flush_sends_pending_in_batches(monkeypatch):
+    """Emails still queued are sent in full-size batches by flush()"""
+    sender = BatchSender(batch_size=2, flush_interval=60)
+    sent = []
+    monkeypatch.setattr(sender, "_send", lambda batch: sent.append([email_id for _, email_id, _ in batch]))
+    # Keep the background flusher from taking the emails first
+    monkeypatch.setattr(sender, "_flusher", object())
+
+    email_ids = [sender.enqueue({"to": f"user{i}@example.com"}) for i in range(3)]
+    sender.flush()
+
+    assert sent == [email_ids[:2], email_ids[2:]]
+    sender.flush()
+    assert len(sent) == 2
+
+
+def test_configure_replaces_sender(monkeypatch):
+    """configure() applies the flush interval and pool size to new sends"""
+    monkeypatch.setattr(mailer, "_sender", mailer._sender)
+    try:
+        mailer.configure(workers=2, flush_interval=5)
+
+        assert mailer._sender.flush_interval == 5
+        assert mailer._sender._executor._max_workers == 2
+        adapter = mailer.session.get_adapter("https://api.resend.com")
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 2
+    finally:
+        mailer._mount_adapter(mailer.WORKERS)
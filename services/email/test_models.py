@@ -1,6 +1,6 @@
 """
-Test script for Pydantic models validation.
-Run this to verify all models work correctly with strict type checking.
+Tests for Pydantic models validation.
+Run with pytest to verify all models work correctly with strict type checking.
 """
 
 from models import (
@@ -9,212 +9,109 @@ from models import (
     WelcomeEmailRequest,
     EmailResponse,
     ErrorResponse,
-    HealthResponse
+    HealthResponse,
+    validation_error_response,
+    warmup
 )
 from pydantic import ValidationError
 import json
-
-
-def test_verification_email_request():
-    """Test VerificationEmailRequest validation"""
-    print("\n=== Testing VerificationEmailRequest ===")
-    
-    # Valid request
-    try:
-        valid = VerificationEmailRequest(
-            to_email="user@example.com",
-            username="johndoe",
-            otp="123456"
-        )
-        print(f"✓ Valid request: {valid.model_dump()}")
-    except ValidationError as e:
-        print(f"✗ Unexpected validation error: {e}")
-    
-    # Invalid email
-    try:
-        invalid = VerificationEmailRequest(
-            to_email="not-an-email",
-            username="johndoe",
-            otp="123456"
-        )
-        print(f"✗ Should have failed: invalid email")
-    except ValidationError as e:
-        print(f"✓ Caught invalid email: {e.error_count()} error(s)")
-    
-    # Invalid OTP (not 6 digits)
-    try:
-        invalid = VerificationEmailRequest(
-            to_email="user@example.com",
-            username="johndoe",
-            otp="12345"
-        )
-        print(f"✗ Should have failed: invalid OTP length")
-    except ValidationError as e:
-        print(f"✓ Caught invalid OTP: {e.error_count()} error(s)")
-    
-    # Invalid OTP (not all digits)
-    try:
-        invalid = VerificationEmailRequest(
-            to_email="user@example.com",
-            username="johndoe",
-            otp="12345a"
-        )
-        print(f"✗ Should have failed: invalid OTP format")
-    except ValidationError as e:
-        print(f"✓ Caught invalid OTP format: {e.error_count()} error(s)")
-    
-    # Empty username
-    try:
-        invalid = VerificationEmailRequest(
-            to_email="user@example.com",
-            username="",
-            otp="123456"
-        )
-        print(f"✗ Should have failed: empty username")
-    except ValidationError as e:
-        print(f"✓ Caught empty username: {e.error_count()} error(s)")
-    
-    # Username too short
-    try:
-        invalid = VerificationEmailRequest(
-            to_email="user@example.com",
-            username="ab",
-            otp="123456"
-        )
-        print(f"✗ Should have failed: username too short")
-    except ValidationError as e:
-        print(f"✓ Caught username too short: {e.error_count()} error(s)")
-
-
-def test_password_reset_email_request():
-    """Test PasswordResetEmailRequest validation"""
-    print("\n=== Testing PasswordResetEmailRequest ===")
-    
-    # Valid request
-    try:
-        valid = PasswordResetEmailRequest(
-            to_email="user@example.com",
-            username="johndoe",
-            otp="654321"
-        )
-        print(f"✓ Valid request: {valid.model_dump()}")
-    except ValidationError as e:
-        print(f"✗ Unexpected validation error: {e}")
-
-
-def test_welcome_email_request():
-    """Test WelcomeEmailRequest validation"""
-    print("\n=== Testing WelcomeEmailRequest ===")
-    
-    # Valid request
-    try:
-        valid = WelcomeEmailRequest(
-            to_email="user@example.com",
-            username="johndoe"
-        )
-        print(f"✓ Valid request: {valid.model_dump()}")
-    except ValidationError as e:
-        print(f"✗ Unexpected validation error: {e}")
-    
-    # Missing field
-    try:
-        invalid = WelcomeEmailRequest(
-            to_email="user@example.com"
-        )
-        print(f"✗ Should have failed: missing username")
-    except ValidationError as e:
-        print(f"✓ Caught missing field: {e.error_count()} error(s)")
-
-
-def test_email_response():
-    """Test EmailResponse model"""
-    print("\n=== Testing EmailResponse ===")
-    
-    response = EmailResponse(
-        success=True,
-        email_id="abc123-def456",
-        message="Email sent successfully"
-    )
-    print(f"✓ EmailResponse: {response.model_dump()}")
-
-
-def test_error_response():
-    """Test ErrorResponse model"""
-    print("\n=== Testing ErrorResponse ===")
-    
-    error = ErrorResponse(
-        error="Invalid email format",
-        details={"field": "to_email", "issue": "not a valid email"}
-    )
-    print(f"✓ ErrorResponse: {error.model_dump()}")
-
-
-def test_health_response():
-    """Test HealthResponse model"""
-    print("\n=== Testing HealthResponse ===")
-    
-    health = HealthResponse(
-        status="healthy",
-        service="email-service",
-        version="1.0.0"
-    )
-    print(f"✓ HealthResponse: {health.model_dump()}")
+import pytest
+
+
+VALID_OTP_REQUEST = {
+    "to_email": "user@example.com",
+    "username": "johndoe",
+    "otp": "123456"
+}
+
+
+@pytest.mark.parametrize("model", [VerificationEmailRequest, PasswordResetEmailRequest])
+def test_otp_email_request_valid(model):
+    """Valid OTP email requests are accepted"""
+    request = model(**VALID_OTP_REQUEST)
+    assert request.model_dump() == VALID_OTP_REQUEST
+
+
+@pytest.mark.parametrize("model", [VerificationEmailRequest, PasswordResetEmailRequest])
+@pytest.mark.parametrize("field,value", [
+    ("to_email", "not-an-email"),   # invalid email
+    ("otp", "12345"),               # OTP too short
+    ("otp", "1234567"),             # OTP too long
+    ("otp", "12345a"),              # OTP not all digits
+    ("username", ""),               # empty username
+    ("username", "   "),            # whitespace-only username
+    ("username", "ab"),             # username too short
+    ("username", "a" * 51),         # username too long
+])
+def test_otp_email_request_invalid(model, field, value):
+    """Invalid OTP email requests are rejected"""
+    with pytest.raises(ValidationError) as exc_info:
+        model(**{**VALID_OTP_REQUEST, field: value})
+    assert exc_info.value.error_count() == 1
+
+
+def test_welcome_email_request_valid():
+    """Valid welcome email requests are accepted"""
+    request = WelcomeEmailRequest(to_email="user@example.com", username="johndoe")
+    assert request.model_dump() == {"to_email": "user@example.com", "username": "johndoe"}
+
+
+@pytest.mark.parametrize("payload", [
+    {"to_email": "user@example.com"},                         # missing username
+    {"username": "johndoe"},                                  # missing email
+    {"to_email": "user@example.com", "username": "ab"},       # username too short
+])
+def test_welcome_email_request_invalid(payload):
+    """Invalid welcome email requests are rejected"""
+    with pytest.raises(ValidationError):
+        WelcomeEmailRequest(**payload)
+
+
+@pytest.mark.parametrize("model,payload", [
+    (EmailResponse, {"success": True, "email_id": "abc123-def456", "message": "Email sent successfully"}),
+    (ErrorResponse, {"error": "Invalid email format", "details": {"field": "to_email", "issue": "not a valid email"}}),
+    (HealthResponse, {"status": "healthy", "service": "email-service", "version": "1.0.0"}),
+])
+def test_response_models(model, payload):
+    """Response models round-trip their fields"""
+    assert model(**payload).model_dump() == payload
 
 
 def test_json_serialization():
     """Test JSON serialization and deserialization"""
-    print("\n=== Testing JSON Serialization ===")
-    
-    # Create a request
-    request = VerificationEmailRequest(
-        to_email="user@example.com",
-        username="johndoe",
-        otp="123456"
-    )
-    
-    # Serialize to JSON
+    request = VerificationEmailRequest(**VALID_OTP_REQUEST)
+
     json_str = request.model_dump_json()
-    print(f"✓ Serialized to JSON: {json_str}")
-    
-    # Deserialize from JSON
-    json_dict = json.loads(json_str)
-    reconstructed = VerificationEmailRequest(**json_dict)
-    print(f"✓ Deserialized from JSON: {reconstructed.model_dump()}")
-    
-    # Verify they're equal
+    reconstructed = VerificationEmailRequest(**json.loads(json_str))
     assert request.model_dump() == reconstructed.model_dump()
-    print("✓ Original and reconstructed are equal")
+
+    assert VerificationEmailRequest.model_validate_json(json_str) == request
 
 
 def test_whitespace_stripping():
     """Test that whitespace is automatically stripped"""
-    print("\n=== Testing Whitespace Stripping ===")
-    
     request = VerificationEmailRequest(
         to_email="  user@example.com  ",
         username="  johndoe  ",
         otp="123456"
     )
-    
+
     assert request.to_email == "user@example.com"
     assert request.username == "johndoe"
-    print("✓ Whitespace stripped successfully")
-
-
-if __name__ == "__main__":
-    print("=" * 60)
-    print("Running Pydantic Model Validation Tests")
-    print("=" * 60)
-    
-    test_verification_email_request()
-    test_password_reset_email_request()
-    test_welcome_email_request()
-    test_email_response()
-    test_error_response()
-    test_health_response()
-    test_json_serialization()
-    test_whitespace_stripping()
-    
-    print("\n" + "=" * 60)
-    print("All tests completed!")
-    print("=" * 60)
+
+
+@pytest.mark.parametrize("body", [b"\xff\xfe", b"{not json", b'{"to_email": "nope"}'])
+def test_validation_error_response(body):
+    """Malformed and non-UTF-8 bodies still produce a JSON error body"""
+    with pytest.raises(ValidationError) as exc_info:
+        VerificationEmailRequest.model_validate_json(body)
+
+    response = json.loads(validation_error_response(exc_info.value).model_dump_json())
+    assert response["error"] == "Validation error"
+    assert response["details"]["errors"]
+    assert all("input" not in error for error in response["details"]["errors"])
+
+
+def test_warmup():
+    """Every model's schema example validates, so warmup succeeds"""
+    warmup()
@@ -0,0 +1,102 @@
+"""
+Tests for the in-process send throttling.
+"""
+
+import throttle
+from throttle import RecentSends, SlidingWindowLimiter
+
+
+class FakeClock:
+    """Controllable stand-in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limiter_allows_up_to_limit(monkeypatch):
+    """Hits beyond the limit within the window are rejected"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    limiter = SlidingWindowLimiter(limit=3, window=60)
+
+    assert [limiter.hit("a") for _ in range(4)] == [True, True, True, False]
+    # Other keys have their own budget
+    assert limiter.hit("b")
+
+
+def test_limiter_window_slides(monkeypatch):
+    """Hits older than the window no longer count towards the limit"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    limiter = SlidingWindowLimiter(limit=2, window=60)
+
+    assert limiter.hit("a")
+    clock.now += 30
+    assert limiter.hit("a")
+    assert not limiter.hit("a")
+
+    clock.now += 31
+    assert limiter.hit("a")
+    assert not limiter.hit("a")
+
+
+def test_limiter_prunes_idle_keys(monkeypatch):
+    """Idle keys are dropped once the table grows past the prune threshold"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    monkeypatch.setattr(throttle, "_PRUNE_THRESHOLD", 2)
+    limiter = SlidingWindowLimiter(limit=1, window=60)
+
+    limiter.hit("a")
+    limiter.hit("b")
+    clock.now += 61
+    limiter.hit("c")
+
+    assert list(limiter._hits) == ["c"]
+
+
+def test_live_keys_are_not_rescanned_for_every_new_key(monkeypatch):
+    """A sweep that frees nothing defers the next one until the table doubles"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    monkeypatch.setattr(throttle, "_PRUNE_THRESHOLD", 4)
+    recent = RecentSends()
+    sweeps = []
+    prune = recent._prune
+    monkeypatch.setattr(recent, "_prune", lambda now: sweeps.append(now) or prune(now))
+
+    for i in range(16):
+        assert recent.add(str(i), ttl=3600)
+
+    # Sweeps at 4 and 8 live keys only
+    assert len(sweeps) == 2
+
+
+def test_recent_sends_rejects_repeats_until_expiry(monkeypatch):
+    """A key can only be added again once its TTL has passed"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    recent = RecentSends()
+
+    assert recent.add("a", ttl=60)
+    assert not recent.add("a", ttl=60)
+    assert recent.add("b", ttl=60)
+
+    clock.now += 61
+    assert recent.add("a", ttl=60)
+
+
+def test_recent_sends_discard(monkeypatch):
+    """A discarded key can be added again before its TTL has passed"""
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    recent = RecentSends()
+
+    assert recent.add("a", ttl=60)
+    recent.discard("a")
+    assert recent.add("a", ttl=60)
+    # Discarding an unknown key is a no-op
+    recent.discard("b")
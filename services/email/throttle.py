@@ -0,0 +1,86 @@
+"""
+In-process throttling for the send endpoints.
+Limits are tracked per gunicorn worker process, so the effective limit for
+the whole service is the configured limit times the number of workers.
+"""
+
+from collections import deque
+import threading
+import time
+
+# Idle keys are only swept once the table grows past this many entries.
+# After a sweep the next one waits until the table has doubled from what
+# survived, so a table of live keys is not rescanned for every new key.
+_PRUNE_THRESHOLD = 10_000
+
+
+class SlidingWindowLimiter:
+    """Allow at most `limit` hits per key within a rolling window of `window` seconds"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits: dict[str, deque] = {}
+        self._prune_at = _PRUNE_THRESHOLD
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> bool:
+        """Record a hit for `key`; return False if the key is over its limit"""
+        now = time.monotonic()
+        cutoff = now - self.window
+
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= self._prune_at:
+                    self._prune(cutoff)
+                    self._prune_at = max(_PRUNE_THRESHOLD, 2 * len(self._hits))
+                hits = self._hits[key] = deque()
+
+            while hits and hits[0] <= cutoff:
+                hits.popleft()
+
+            if len(hits) >= self.limit:
+                return False
+
+            hits.append(now)
+            return True
+
+    def _prune(self, cutoff: float) -> None:
+        """Drop keys whose most recent hit has left the window"""
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= cutoff]:
+            del self._hits[key]
+
+
+class RecentSends:
+    """Remember keys for a limited time, to detect repeated sends"""
+
+    def __init__(self):
+        self._expiry: dict[str, float] = {}
+        self._prune_at = _PRUNE_THRESHOLD
+        self._lock = threading.Lock()
+
+    def add(self, key: str, ttl: float) -> bool:
+        """Remember `key` for `ttl` seconds; return False if it is already remembered"""
+        now = time.monotonic()
+
+        with self._lock:
+            expires = self._expiry.get(key)
+            if expires is not None and expires > now:
+                return False
+
+            if expires is None and len(self._expiry) >= self._prune_at:
+                self._prune(now)
+                self._prune_at = max(_PRUNE_THRESHOLD, 2 * len(self._expiry))
+            self._expiry[key] = now + ttl
+            return True
+
+    def discard(self, key: str) -> None:
+        """Forget `key`, so it can be added again straight away"""
+        with self._lock:
+            self._expiry.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        """Drop keys that have expired"""
+        for key in [k for k, expires in self._expiry.items() if expires <= now]:
+            del self._expiry[key]
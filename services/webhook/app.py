@@ -1,143 +1,304 @@
 """
 Webhook Service - Handles deployment webhooks and triggers GitHub Actions
 """
-from flask import Flask, request, jsonify
-import requests
+# Patch blocking stdlib I/O before anything else imports socket/ssl, so the
+# outbound GitHub calls yield to other requests under gevent workers
+from gevent import monkey
+monkey.patch_all()
+
+from flask import Flask, Response, request
+from werkzeug.exceptions import HTTPException
+import orjson
+import httpx
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
 import logging
+import logging.handlers
+import queue
+import atexit
+import functools
 import hmac
-import hashlib
+from typing import Any
 
-logging.basicConfig(level=logging.INFO)
+# Records are queued and written to stderr by a listener. Under gevent the
+# listener is a greenlet on the worker's own thread, so the write still
+# blocks that worker; it only moves the write off the request's own path,
+# to whenever the request next yields
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Railway deploy payloads are a few KB; larger bodies are refused with 413
+# before they are read into memory
+app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
 
 # Configuration
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO", "Hamza-Bin-Aamir/tabrela")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Optional: for verifying Railway webhooks
 
+# Configuration is fixed for the life of the process, so it is resolved once
+_VERIFY_ENABLED = bool(WEBHOOK_SECRET)
+_DISPATCH_ENABLED = bool(GITHUB_TOKEN)
+_SECRET_BYTES = WEBHOOK_SECRET.encode() if _VERIFY_ENABLED else None
+
+# Keyed HMAC state built once; each request copies it instead of
+# re-deriving the key schedule from WEBHOOK_SECRET. Naming the digest
+# ("sha256") keeps it on OpenSSL's HMAC rather than the pure-Python fallback.
+_HMAC_TEMPLATE = hmac.new(_SECRET_BYTES, digestmod="sha256") if _VERIFY_ENABLED else None
+
+# X-Signature headers look like "sha256=<hex digest>"
+_SIGNATURE_PREFIX = "sha256="
+
+# GitHub dispatch target and headers never change after startup
+_GH_DISPATCH_PATH = f"/repos/{GITHUB_REPO}/dispatches"
+_GH_HEADERS = {
+    "Accept": "application/vnd.github.v3+json",
+    "Authorization": f"token {GITHUB_TOKEN}",
+    "Content-Type": "application/json",
+    "User-Agent": "Tabrela-Webhook-Service"
+}
+
+# Not fatal: the container healthcheck needs /health up even when the
+# token is missing
+if not _DISPATCH_ENABLED:
+    logger.error("GITHUB_TOKEN not configured - deploy webhooks will be rejected")
+
+# Long-lived HTTP/2 client for the GitHub API: concurrent dispatches are
+# multiplexed over one kept-alive TLS connection instead of opening new ones.
+# Connection failures are retried twice.
+_gh = httpx.Client(
+    base_url="https://api.github.com",
+    headers=_GH_HEADERS,
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300)
+    )
+)
+
+
+# Byte strings that must appear in any payload that can pass the success check
+_SUCCESS_MARKERS = (b'"SUCCESS"', b'"COMPLETED"', b'"deployment.completed"')
 
-def verify_webhook_signature(payload: bytes, signature: str) -> bool:
+# GitHub dispatches run in the background so Railway gets its response
+# without waiting on the GitHub API round-trip
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gh-dispatch")
+
+
+def _dispatch(commit_sha: str, deployment_id: str, environment: str) -> None:
+    """Trigger the frontend deploy workflow via repository_dispatch"""
+    try:
+        github_response = _gh.post(
+            _GH_DISPATCH_PATH,
+            content=orjson.dumps({
+                "event_type": "railway-deploy-success",
+                "client_payload": {
+                    "commit_sha": commit_sha,
+                    "deployment_id": deployment_id,
+                    "environment": environment
+                }
+            })
+        )
+    except httpx.HTTPError as e:
+        logger.error("GitHub API request failed for commit %s: %s", commit_sha, e)
+        return
+    
+    if github_response.status_code not in [200, 204]:
+        logger.error("GitHub API error: %s - %s", github_response.status_code, github_response.text)
+        return
+    
+    logger.info("Successfully triggered frontend deploy for commit: %s", commit_sha)
+
+
+def _warm_github_connection() -> None:
+    """Open the GitHub connection ahead of the first webhook"""
+    try:
+        _gh.head("/")
+    except httpx.HTTPError as e:
+        logger.warning("Could not pre-connect to GitHub API: %s", e)
+
+
+def _log_dispatch_failure(future: Future) -> None:
+    """Log dispatches that raised unexpectedly"""
+    error = future.exception()
+    if error is not None:
+        logger.error("GitHub dispatch failed: %s", error)
+
+
+# Pay the TCP/TLS handshake at startup, off the import path. Skipped without
+# a token, as nothing will be dispatched
+if _DISPATCH_ENABLED:
+    _executor.submit(_warm_github_connection)
+
+
+def _dig(data: Any, *keys: str, default: Any = None) -> Any:
+    """Look up a nested key path, returning `default` if any level is missing"""
+    for key in keys:
+        if not isinstance(data, dict):
+            return default
+        data = data.get(key)
+        if data is None:
+            return default
+    return data
+
+
+def verify_webhook_signature(payload: bytes, signature: str | None) -> bool:
     """Verify webhook signature if WEBHOOK_SECRET is configured"""
-    if not WEBHOOK_SECRET:
+    if not _VERIFY_ENABLED:
         return True  # Skip verification if no secret configured
     
-    if not signature:
+    if not signature or not signature.startswith(_SIGNATURE_PREFIX):
         return False
     
-    expected = hmac.new(
-        WEBHOOK_SECRET.encode(),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
+    try:
+        provided = bytes.fromhex(signature[len(_SIGNATURE_PREFIX):])
+    except ValueError:
+        return False
     
-    return hmac.compare_digest(f"sha256={expected}", signature)
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(payload)
+    
+    # Compare raw digests in constant time; no hex encoding of our side
+    return hmac.compare_digest(mac.digest(), provided)
+
+
+def json_response(data: dict[str, Any], status: int) -> Response:
+    """Build a JSON response serialized with orjson"""
+    return Response(orjson.dumps(data), status=status, mimetype="application/json")
+
+
+# Constant response bodies are serialized once at import
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "webhook-service",
+    "version": "1.0.0"
+})
+
+
+def _ignored_body(status: Any) -> bytes:
+    """Serialized reply for a deployment that is not successful"""
+    # Statuses are normally a handful of strings; anything else (possibly
+    # unhashable) is serialized per request
+    if status is None or isinstance(status, str):
+        return _ignored_body_cached(status)
+    return _ignored_body_cached.__wrapped__(status)
+
+
+@functools.lru_cache(maxsize=32)
+def _ignored_body_cached(status: str | None) -> bytes:
+    return orjson.dumps({
+        "message": "Ignored - deployment not successful",
+        "status": status
+    })
 
 
 @app.route("/health", methods=["GET"])
-def health():
+def health() -> Response:
     """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "service": "webhook-service",
-        "version": "1.0.0"
-    }), 200
+    return Response(_HEALTH_BODY, status=200, mimetype="application/json")
 
 
 @app.route("/railway-deploy", methods=["POST"])
-def railway_deploy_webhook():
+def railway_deploy_webhook() -> Response | tuple[str, int]:
     """
     Handle Railway deployment webhook.
     
     Railway sends a POST request when deployment completes.
     This endpoint triggers GitHub Actions to deploy the frontend.
     """
+    # Read the body once; it is used for both the signature and the payload.
+    # hmac and orjson both read these bytes in place, so no further copies
+    # are made.
+    raw = request.get_data(cache=False)
+    
+    # Cheap byte scan first: a payload without any success marker can never
+    # trigger a deploy, so skip signature verification and JSON parsing
+    if not any(marker in raw for marker in _SUCCESS_MARKERS):
+        return "", 204
+    
     # Verify signature if configured
     signature = request.headers.get("X-Signature")
-    if not verify_webhook_signature(request.data, signature):
+    if not verify_webhook_signature(raw, signature):
         logger.warning("Invalid webhook signature")
-        return jsonify({"error": "Invalid signature"}), 401
+        return json_response({"error": "Invalid signature"}, 401)
     
     try:
-        payload = request.json
-        logger.info(f"Received Railway webhook: {payload}")
-        
-        # Railway webhook payload structure varies, handle common cases
-        # Check for successful deployment
-        status = (
-            payload.get("deployment", {}).get("status") or
-            payload.get("status") or
-            payload.get("type")
-        )
-        
-        # Only trigger on successful deployments
-        # Railway uses "SUCCESS" or the event type might be "deployment.completed"
-        is_success = (
-            status == "SUCCESS" or
-            status == "COMPLETED" or
-            payload.get("type") == "deployment.completed"
-        )
-        
-        if not is_success:
-            logger.info(f"Deployment status '{status}' is not successful, skipping")
-            return jsonify({
-                "message": "Ignored - deployment not successful",
-                "status": status
-            }), 200
-        
-        # Extract commit SHA
-        commit_sha = (
-            payload.get("deployment", {}).get("meta", {}).get("commitHash") or
-            payload.get("meta", {}).get("commitHash") or
-            payload.get("commitHash") or
-            "unknown"
-        )
-        
-        # Trigger GitHub Actions
-        if not GITHUB_TOKEN:
-            logger.error("GITHUB_TOKEN not configured")
-            return jsonify({"error": "GITHUB_TOKEN not configured"}), 500
-        
-        github_response = requests.post(
-            f"https://api.github.com/repos/{GITHUB_REPO}/dispatches",
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {GITHUB_TOKEN}",
-                "Content-Type": "application/json",
-                "User-Agent": "Tabrela-Webhook-Service"
-            },
-            json={
-                "event_type": "railway-deploy-success",
-                "client_payload": {
-                    "commit_sha": commit_sha,
-                    "deployment_id": payload.get("deployment", {}).get("id", "unknown"),
-                    "environment": payload.get("environment", {}).get("name", "production")
-                }
-            },
-            timeout=10
-        )
-        
-        if github_response.status_code not in [200, 204]:
-            logger.error(f"GitHub API error: {github_response.status_code} - {github_response.text}")
-            return jsonify({
-                "error": "Failed to trigger GitHub Actions",
-                "status_code": github_response.status_code
-            }), 500
-        
-        logger.info(f"Successfully triggered frontend deploy for commit: {commit_sha}")
-        return jsonify({
-            "message": "Frontend deployment triggered",
-            "commit_sha": commit_sha
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Webhook handler error: {e}")
-        return jsonify({"error": str(e)}), 500
+        payload: Any = orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        logger.warning("Malformed webhook payload: %s", e)
+        return json_response({"error": "Invalid JSON payload"}, 400)
+    
+    if not isinstance(payload, dict):
+        logger.warning("Webhook payload is not a JSON object")
+        return json_response({"error": "Invalid JSON payload"}, 400)
+    
+    logger.debug("Received Railway webhook: %r", payload)
+    
+    # Railway webhook payload structure varies, handle common cases
+    # Check for successful deployment
+    status: Any = (
+        _dig(payload, "deployment", "status") or
+        payload.get("status") or
+        payload.get("type")
+    )
+    
+    # Only trigger on successful deployments
+    # Railway uses "SUCCESS" or the event type might be "deployment.completed"
+    is_success = (
+        status == "SUCCESS" or
+        status == "COMPLETED" or
+        payload.get("type") == "deployment.completed"
+    )
+    
+    if not is_success:
+        logger.info("Deployment status '%s' is not successful, skipping", status)
+        return Response(_ignored_body(status), status=200, mimetype="application/json")
+    
+    # Extract commit SHA; payload values are not guaranteed to be strings
+    commit_sha = str(
+        _dig(payload, "deployment", "meta", "commitHash") or
+        _dig(payload, "meta", "commitHash") or
+        payload.get("commitHash") or
+        "unknown"
+    )
+    
+    # Trigger GitHub Actions
+    if not _DISPATCH_ENABLED:
+        logger.error("GITHUB_TOKEN not configured")
+        return json_response({"error": "GITHUB_TOKEN not configured"}, 500)
+    
+    _executor.submit(
+        _dispatch,
+        commit_sha,
+        str(_dig(payload, "deployment", "id", default="unknown")),
+        str(_dig(payload, "environment", "name", default="production"))
+    ).add_done_callback(_log_dispatch_failure)
+    
+    logger.info("Queued frontend deploy for commit: %s", commit_sha)
+    return json_response({
+        "message": "Frontend deployment queued",
+        "commit_sha": commit_sha
+    }, 202)
+
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e: Exception) -> Response | HTTPException:
+    """Log unhandled errors and answer with a JSON 500"""
+    # Routing errors (404, 405, ...) keep their own status and page
+    if isinstance(e, HTTPException):
+        return e
+    logger.error("Webhook handler error: %s", e, exc_info=True)
+    return json_response({"error": str(e)}, 500)
 
 
 if __name__ == "__main__":
+    # Local testing only - production runs under gunicorn (see README)
     port = int(os.getenv("PORT", 5001))
-    logger.info(f"Starting webhook service on port {port}")
+    logger.info("Starting webhook service on port %s", port)
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for the webhook service.
+Loaded automatically when gunicorn is started from this directory; the
+bind address, worker class and worker count are passed on the command line
+(see docker/supervisord.conf).
+
+Gunicorn already sets TCP_NODELAY on its TCP listener, and on Linux accepted
+connections inherit it, so small webhook responses are not held back by
+Nagle's algorithm.
+"""
+
+import os
+
+# Bind with SO_REUSEPORT so a restarting server can bind the port while the
+# old one is still draining
+reuse_port = True
+
+# Keep worker heartbeat files in memory rather than on the container's
+# overlay filesystem, where fsync stalls can make workers look hung
+worker_tmp_dir = "/dev/shm"
+
+
+def pre_fork(server, worker):
+    """Pick a CPU from WEBHOOK_CPU_AFFINITY (e.g. "2,3") for the new worker, if set"""
+    value = os.getenv("WEBHOOK_CPU_AFFINITY", "")
+    try:
+        cpus = [int(cpu) for cpu in value.split(",") if cpu.strip()]
+    except ValueError:
+        server.log.warning("Ignoring invalid WEBHOOK_CPU_AFFINITY: %r", value)
+        return
+    if not cpus:
+        return
+
+    # Runs in the arbiter, so the choice is recorded on the worker object it
+    # keeps; a replacement worker takes over whichever CPU the dead one freed
+    in_use = [getattr(w, "cpu", None) for w in server.WORKERS.values()]
+    worker.cpu = min(cpus, key=in_use.count)
+
+
+def post_fork(server, worker):
+    """Pin the new worker to the CPU chosen for it in pre_fork"""
+    cpu = getattr(worker, "cpu", None)
+    if cpu is None:
+        return
+
+    try:
+        os.sched_setaffinity(0, {cpu})
+        server.log.info("Worker %s pinned to CPU %s", worker.pid, cpu)
+    except (AttributeError, OSError) as e:
+        server.log.warning("Could not pin worker %s to CPU %s: %s", worker.pid, cpu, e)
@@ -0,0 +1,117 @@
+"""
+Tests for webhook authentication and request filtering.
+GitHub dispatches are captured instead of being sent.
+"""
+
+import hashlib
+import hmac
+import json
+
+import pytest
+
+import app
+
+SECRET = b"test-webhook-secret"
+
+SUCCESS_PAYLOAD = {
+    "deployment": {"status": "SUCCESS", "id": "dep-1", "meta": {"commitHash": "abc123"}},
+    "environment": {"name": "production"}
+}
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(SECRET, body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    """Verification enabled with SECRET, and dispatches captured"""
+    calls = []
+
+    class FakeFuture:
+        def add_done_callback(self, callback):
+            pass
+
+    def submit(fn, *args):
+        calls.append(args)
+        return FakeFuture()
+
+    monkeypatch.setattr(app, "_VERIFY_ENABLED", True)
+    monkeypatch.setattr(app, "_HMAC_TEMPLATE", hmac.new(SECRET, digestmod="sha256"))
+    monkeypatch.setattr(app, "_DISPATCH_ENABLED", True)
+    monkeypatch.setattr(app._executor, "submit", submit)
+    return calls
+
+
+def post(body: bytes, signature: str | None = None):
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers["X-Signature"] = signature
+    return app.app.test_client().post("/railway-deploy", data=body, headers=headers)
+
+
+def test_valid_signature_queues_dispatch(dispatched):
+    """A correctly signed successful deployment is dispatched"""
+    body = json.dumps(SUCCESS_PAYLOAD).encode()
+    response = post(body, sign(body))
+
+    assert response.status_code == 202
+    assert response.get_json()["commit_sha"] == "abc123"
+    assert dispatched == [("abc123", "dep-1", "production")]
+
+
+@pytest.mark.parametrize("signature", [
+    "sha256=" + "00" * 32,  # well-formed but wrong
+    "sha256=zz",  # not hex
+    "sha256=",  # empty digest
+])
+def test_bad_signature_rejected(dispatched, signature):
+    """Wrong or malformed digests are rejected"""
+    response = post(json.dumps(SUCCESS_PAYLOAD).encode(), signature)
+
+    assert response.status_code == 401
+    assert dispatched == []
+
+
+def test_signature_without_prefix_rejected(dispatched):
+    """A correct digest without the sha256= prefix is rejected"""
+    body = json.dumps(SUCCESS_PAYLOAD).encode()
+    response = post(body, sign(body)[len("sha256="):])
+
+    assert response.status_code == 401
+    assert dispatched == []
+
+
+def test_payload_without_success_marker_dropped(dispatched):
+    """Payloads that cannot be a successful deployment get 204 before verification"""
+    response = post(json.dumps({"deployment": {"status": "BUILDING"}}).encode())
+
+    assert response.status_code == 204
+    assert response.get_data() == b""
+    assert dispatched == []
+
+
+def test_unsigned_payload_with_marker_rejected(dispatched):
+    """A success marker alone does not get past signature verification"""
+    response = post(json.dumps(SUCCESS_PAYLOAD).encode())
+
+    assert response.status_code == 401
+    assert dispatched == []
+
+
+def test_non_object_json_rejected(dispatched):
+    """A signed body that is not a JSON object gets 400"""
+    body = b'["SUCCESS"]'
+    response = post(body, sign(body))
+
+    assert response.status_code == 400
+    assert dispatched == []
+
+
+def test_oversize_body_rejected(dispatched):
+    """Bodies over MAX_CONTENT_LENGTH are refused with 413"""
+    body = b'{"status": "SUCCESS", "padding": "' + b"a" * app.app.config["MAX_CONTENT_LENGTH"] + b'"}'
+    response = post(body, sign(body))
+
+    assert response.status_code == 413
+    assert dispatched == []